@@ -0,0 +1,19 @@
+# Production server settings: gunicorn main:app
+#
+# Reviews spend almost all of their time waiting on GitHub and OpenAI, so each
+# worker process runs many threads to keep several /review calls in flight.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Must exceed the slowest /review that still ends in a JSON error. Each GitHub
+# call is bounded at ~30s (15s read plus connect retries), and calls run in
+# sequence: head-sha lookup, two GraphQL queries, REST fallback (file list,
+# then raw contents), then the review and label posts (7 x 30s). OpenAI adds
+# 3 attempts of 30s plus backoff (~95s). Total is about 305s.
+timeout = 330
+keepalive = 5
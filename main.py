@@ -2,11 +2,23 @@
 
 from flask import Flask, render_template, request, jsonify
 import os
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 app = Flask(__name__)
 
@@ -14,61 +26,429 @@ app = Flask(__name__)
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 OPENAI_KEY = os.environ.get("OPENAI_API_KEY")
 
-client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
+# The OpenAI client shares one connection pool across worker threads; idle
+# connections are kept long enough to survive the gap between reviews instead
+# of expiring after the httpx default of 5 seconds.
+client = OpenAI(
+    api_key=OPENAI_KEY,
+    timeout=30.0,
+    max_retries=2,
+    http_client=DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=120)
+    ),
+) if OPENAI_KEY else None
+
+# Upper bound on concurrent GitHub requests issued for a single review
+MAX_FETCH_WORKERS = 10
+
+# (connect, read) seconds for every GitHub call, so a hung connection fails
+# fast instead of pinning a worker thread
+GITHUB_TIMEOUT = (3.05, 15)
+
+# Shared session so GitHub API and raw-content calls reuse pooled keep-alive connections
+GH_SESSION = requests.Session()
+GH_SESSION.headers.update({'Accept': 'application/vnd.github+json'})
+GH_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    # Read timeouts are not retried, so one call stays within GITHUB_TIMEOUT
+    # plus a few quick connect retries
+    max_retries=Retry(total=3, read=0, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+))
+
+# Conditional-GET cache: (url, params, token) -> (etag, last_modified, body).
+# GitHub answers revalidations with a 304 that does not count against the rate limit.
+HTTP_CACHE = {}
+HTTP_CACHE_MAX_ENTRIES = 512
+# Larger bodies (big PR diffs) are not kept, which bounds the cache's memory
+HTTP_CACHE_MAX_BODY_CHARS = 64 * 1024
+HTTP_CACHE_LOCK = threading.Lock()
+
+# Exact-match cache of model output keyed on a hash of the model and prompt, so
+# re-reviewing an unchanged PR (retry, refresh) skips the LLM call
+REVIEW_CACHE = {}
+REVIEW_CACHE_MAX_ENTRIES = 256
+REVIEW_CACHE_LOCK = threading.Lock()
+
+# Finished /review responses persisted per (owner, repo, PR, head sha, model);
+# re-reviewing the same commit returns the stored result without calling
+# OpenAI or posting to GitHub again
+RESULT_CACHE_DIR = os.environ.get('PRREVIEW_CACHE_DIR', '.prreview-cache')
+RESULT_CACHE_TTL = 86400
+# Expired files are removed by a directory sweep at most this often per process
+RESULT_CACHE_SWEEP_INTERVAL = 3600
+RESULT_CACHE_LAST_SWEEP = 0.0
+RESULT_CACHE_SWEEP_LOCK = threading.Lock()
+
+# GraphQL lets a review fetch PR metadata, the file list and blob contents in
+# two POSTs instead of 2 + N REST round trips
+PR_GRAPHQL_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!, $maxFiles: Int!) {
+  repository(owner: $owner, name: $repo) {
+    pullRequest(number: $number) {
+      id
+      title
+      body
+      author { login }
+      headRefName
+      headRefOid
+      baseRefName
+      files(first: $maxFiles) {
+        nodes { path changeType additions deletions }
+      }
+    }
+  }
+}
+"""
+
+# Files whose changed lines are below this fraction of their length are sent to
+# the model as their unified diff rather than their full contents
+DIFF_ONLY_THRESHOLD = 0.2
+
+# Stand-in for files whose contents could not be read (including removed files)
+FETCH_FAILED_CONTENTS = '<<failed to fetch file contents>>'
+
+GRAPHQL_CHANGE_TYPES = {
+    'ADDED': 'added',
+    'MODIFIED': 'modified',
+    'DELETED': 'removed',
+    'RENAMED': 'renamed',
+    'COPIED': 'copied',
+    'CHANGED': 'changed',
+}
+
+# Static prompt text is built once at module level, so every request sends the
+# same bytes for it
+SYSTEM_PROMPT = (
+    "You are a senior software engineer and security expert. "
+    "Produce a clear, concise review of the pull request. "
+    "Return output strictly as JSON with keys: \n"
+    "  - summary (short text summary of the PR quality),\n"
+    "  - comments (list of objects with {path, block, issue, corrected_code, comment}),\n"
+    "  - labels (list of strings).\n\n"
+    "For each comment:\n"
+    "  - path: filename where the issue occurs.\n"
+    "  - block: the specific code block (few lines) where the issue exists.\n"
+    "  - issue: concise description of the problem.\n"
+    "  - corrected_code: corrected code snippet that fixes the issue.\n"
+    "  - comment: a clear explanation of the issue and how the fix resolves it.\n\n"
+    "Important rules:\n"
+    "- Output ONLY valid JSON (no extra text).\n"
+    "- Maximum 6 comments.\n"
+    "- Labels must be chosen from: security-issue, code-logic-issue, build-issue, "
+    "docs-issue, style-issue, perf-issue, other."
+)
+
+# Built once at import; the message is never mutated, so every prompt can share it
+SYSTEM_MESSAGE = {'role': 'system', 'content': SYSTEM_PROMPT}
+
+REVIEW_INSTRUCTIONS = (
+    "\nInstructions:\n"
+    "- Review for correctness, code logic, security issues, architecture/design concerns, "
+    "and potential build/test problems.\n"
+    "- Produce up to 6 actionable comments.\n"
+    "- Suggest labels chosen from: security-issue, code-logic-issue, build-issue, docs-issue, "
+    "style-issue, perf-issue, other.\n"
+    "- Output ONLY valid JSON.\n"
+)
+
+REVIEW_MODEL = "gpt-4o-mini"
+
+# File contents are capped in model tokens when tiktoken is installed; without
+# it the cap is approximated in characters
+CHARS_PER_TOKEN = 4
+# Upper bound on characters per token, used to slice large files before encoding
+MAX_CHARS_PER_TOKEN = 16
+
+# tiktoken may download its BPE table on first use, with no timeout of its own.
+# The load runs in a background thread: a review waits for it at most
+# TOKEN_ENCODING_LOAD_WAIT seconds, and a failed load is retried after
+# TOKEN_ENCODING_RETRY_INTERVAL. Set TIKTOKEN_CACHE_DIR to a pre-populated
+# directory to avoid the download entirely.
+TOKEN_ENCODING = None
+TOKEN_ENCODING_LOADER = None
+TOKEN_ENCODING_RETRY_AT = 0.0
+TOKEN_ENCODING_LOAD_WAIT = 2.0
+TOKEN_ENCODING_RETRY_INTERVAL = 300
+TOKEN_ENCODING_LOCK = threading.Lock()
+
+JSON_DECODER = json.JSONDecoder()
+
+ALLOWED_LABELS = frozenset({
+    'security-issue', 'code-logic-issue', 'build-issue',
+    'docs-issue', 'style-issue', 'perf-issue', 'other'
+})
 
 # Helpers
-PR_URL_REGEX = re.compile(r"https?://github\.com/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pull/(?P<number>\d+)")
+# Owner and repo names are ASCII; the optional tail accepts links copied from
+# any PR tab or commit view (/files, /commits/<sha>, ...)
+PR_URL_REGEX = re.compile(
+    r"https?://github\.com/(?P<owner>[A-Za-z0-9_.-]+)/(?P<repo>[A-Za-z0-9_.-]+)"
+    r"/pull/(?P<number>\d+)(?:/[^?#]*)?(?:[?#].*)?",
+    re.ASCII
+)
 
 
 def parse_pr_url(url):
-    m = PR_URL_REGEX.search(url.strip())
+    m = PR_URL_REGEX.fullmatch(url.strip())
     if not m:
         return None
     return m.group('owner'), m.group('repo'), int(m.group('number'))
 
 
-def github_get(path, token=None, params=None):
-    headers = {'Accept': 'application/vnd.github+json'}
-    if token:
-        headers['Authorization'] = f'token {token}'
-    url = f'https://api.github.com{path}'
-    r = requests.get(url, headers=headers, params=params)
+def auth_headers(token=None):
+    return {'Authorization': f'token {token}'} if token else None
+
+
+def cache_put(cache, key, value, max_entries):
+    # Insertion-ordered dict used as a FIFO; callers hold the cache's lock
+    cache.pop(key, None)
+    if len(cache) >= max_entries:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+
+def cached_get(url, token=None, params=None):
+    key = (url, tuple(sorted((params or {}).items())), token)
+    with HTTP_CACHE_LOCK:
+        entry = HTTP_CACHE.get(key)
+
+    headers = auth_headers(token) or {}
+    if entry:
+        etag, last_modified, _ = entry
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    r = GH_SESSION.get(url, headers=headers, params=params, timeout=GITHUB_TIMEOUT)
+    if r.status_code == 304 and entry:
+        return entry[2]
     r.raise_for_status()
-    return r.json()
+
+    etag = r.headers.get('ETag')
+    last_modified = r.headers.get('Last-Modified')
+    if (etag or last_modified) and len(r.text) <= HTTP_CACHE_MAX_BODY_CHARS:
+        with HTTP_CACHE_LOCK:
+            cache_put(HTTP_CACHE, key, (etag, last_modified, r.text), HTTP_CACHE_MAX_ENTRIES)
+    return r.text
+
+
+def github_get(path, token=None, params=None):
+    return json.loads(cached_get(f'https://api.github.com{path}', token=token, params=params))
 
 
 def github_post(path, json_data, token=None):
-    headers = {'Accept': 'application/vnd.github+json'}
-    if token:
-        headers['Authorization'] = f'token {token}'
     url = f'https://api.github.com{path}'
-    r = requests.post(url, headers=headers, json=json_data)
+    r = GH_SESSION.post(url, headers=auth_headers(token), json=json_data, timeout=GITHUB_TIMEOUT)
     r.raise_for_status()
     return r.json()
 
 
-def fetch_pr_and_files(owner, repo, pr_number, token=None, max_files=5, max_chars_per_file=2000):
-    pr = github_get(f'/repos/{owner}/{repo}/pulls/{pr_number}', token=token)
-    files = github_get(f'/repos/{owner}/{repo}/pulls/{pr_number}/files', token=token)
-    selected = []
-    for f in files[:max_files]:
-        filename = f.get('filename')
-        raw_url = f.get('raw_url')
-        try:
-            file_contents = requests.get(raw_url).text
-        except Exception:
-            file_contents = '<<failed to fetch file contents>>'
-        if len(file_contents) > max_chars_per_file:
-            file_contents = file_contents[:max_chars_per_file] + '\n\n...TRUNCATED...'
-        selected.append({
-            'filename': filename,
-            'status': f.get('status'),
-            'changes': f.get('changes'),
-            'contents': file_contents
-        })
+def fetch_raw_file(raw_url):
+    # raw_url is pinned to a commit sha, so there is nothing to revalidate
+    try:
+        r = GH_SESSION.get(raw_url, timeout=GITHUB_TIMEOUT)
+        r.raise_for_status()
+        return r.text
+    except Exception:
+        return FETCH_FAILED_CONTENTS
+
+
+class GraphQLError(RuntimeError):
+    pass
+
+
+def github_graphql(query, variables, token):
+    r = GH_SESSION.post(
+        'https://api.github.com/graphql',
+        headers={'Authorization': f'bearer {token}'},
+        json={'query': query, 'variables': variables},
+        timeout=GITHUB_TIMEOUT
+    )
+    r.raise_for_status()
+    payload = r.json()
+    if payload.get('errors'):
+        raise GraphQLError(f"GraphQL query failed: {payload['errors']}")
+    return payload['data']
+
+
+def fetch_pr_patches(owner, repo, pr_number, token=None, max_files=5):
+    # The REST file list carries a per-file patch, limited to the files reviewed
+    try:
+        files = github_get(
+            f'/repos/{owner}/{repo}/pulls/{pr_number}/files',
+            token=token,
+            params={'per_page': max_files}
+        )
+    except requests.RequestException:
+        # Without patches every file falls back to its full contents
+        return {}
+    return {f.get('filename'): f.get('patch') for f in files}
+
+
+def load_token_encoding():
+    global TOKEN_ENCODING, TOKEN_ENCODING_RETRY_AT
+    try:
+        TOKEN_ENCODING = tiktoken.encoding_for_model(REVIEW_MODEL)
+    except Exception:
+        TOKEN_ENCODING_RETRY_AT = time.time() + TOKEN_ENCODING_RETRY_INTERVAL
+
+
+def get_token_encoding():
+    # None means fall back to character-based truncation
+    global TOKEN_ENCODING_LOADER
+    if TOKEN_ENCODING is not None or tiktoken is None:
+        return TOKEN_ENCODING
+    with TOKEN_ENCODING_LOCK:
+        loader = TOKEN_ENCODING_LOADER
+        if (loader is None or not loader.is_alive()) and time.time() >= TOKEN_ENCODING_RETRY_AT:
+            loader = threading.Thread(target=load_token_encoding, daemon=True)
+            loader.start()
+            TOKEN_ENCODING_LOADER = loader
+    if loader is not None:
+        loader.join(TOKEN_ENCODING_LOAD_WAIT)
+    return TOKEN_ENCODING
+
+
+def truncate_contents(file_contents, max_tokens_per_file):
+    # Every token covers at least one character, so short text needs no encoding
+    if len(file_contents) <= max_tokens_per_file:
+        return file_contents
+    encoding = get_token_encoding()
+    if encoding is None:
+        max_chars = max_tokens_per_file * CHARS_PER_TOKEN
+        if len(file_contents) > max_chars:
+            return file_contents[:max_chars] + '\n\n...TRUNCATED...'
+        return file_contents
+    # Only the head of a large file can fit, so there is no need to encode the rest
+    head = file_contents[:max_tokens_per_file * MAX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(head, disallowed_special=())
+    if len(tokens) > max_tokens_per_file or len(head) < len(file_contents):
+        return encoding.decode(tokens[:max_tokens_per_file]) + '\n\n...TRUNCATED...'
+    return file_contents
+
+
+def select_file_view(filename, status, changes, file_contents, patch, max_tokens_per_file):
+    # Small edits to large files are reviewed from the diff to keep the prompt
+    # short; the diff is also used whenever the contents could not be fetched
+    total_lines = file_contents.count('\n') + 1
+    use_diff = bool(patch) and (
+        file_contents == FETCH_FAILED_CONTENTS
+        or (changes or 0) < DIFF_ONLY_THRESHOLD * total_lines
+    )
+    return {
+        'filename': filename,
+        'status': status,
+        'changes': changes,
+        'view': 'diff' if use_diff else 'full',
+        'contents': truncate_contents(patch if use_diff else file_contents, max_tokens_per_file)
+    }
+
+
+def fetch_pr_and_files_rest(owner, repo, pr_number, token=None, max_files=5, max_tokens_per_file=500):
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as pool:
+        pr_future = pool.submit(github_get, f'/repos/{owner}/{repo}/pulls/{pr_number}', token=token)
+        files_future = pool.submit(github_get, f'/repos/{owner}/{repo}/pulls/{pr_number}/files', token=token)
+        files = files_future.result()[:max_files]
+        # Raw contents are fetched concurrently; map() keeps the original file order
+        contents = list(pool.map(fetch_raw_file, [f.get('raw_url') for f in files]))
+        pr = pr_future.result()
+
+    # The REST file list already carries each file's patch
+    selected = [
+        select_file_view(
+            f.get('filename'), f.get('status'), f.get('changes'),
+            file_contents, f.get('patch'), max_tokens_per_file
+        )
+        for f, file_contents in zip(files, contents)
+    ]
     return pr, selected
 
 
+def fetch_pr_and_files_graphql(owner, repo, pr_number, token, max_files=5, max_tokens_per_file=500):
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # GraphQL has no patch field, so the REST file list is fetched alongside
+        patches_future = pool.submit(fetch_pr_patches, owner, repo, pr_number, token, max_files)
+        pr, selected = fetch_pr_and_blobs_graphql(owner, repo, pr_number, token, max_files)
+        patches = patches_future.result()
+
+    selected = [
+        select_file_view(
+            f['filename'], f['status'], f['changes'],
+            f['contents'], patches.get(f['filename']), max_tokens_per_file
+        )
+        for f in selected
+    ]
+    return pr, selected
+
+
+def fetch_pr_and_blobs_graphql(owner, repo, pr_number, token, max_files=5):
+    data = github_graphql(
+        PR_GRAPHQL_QUERY,
+        {'owner': owner, 'repo': repo, 'number': pr_number, 'maxFiles': max_files},
+        token
+    )
+    try:
+        node = data['repository']['pullRequest']
+        files = node['files']['nodes']
+    except (KeyError, TypeError) as e:
+        raise GraphQLError(f'Unexpected pull request payload: {e!r}') from e
+
+    # Blob paths are only known after the first query, so contents come from a
+    # second query with one aliased object() lookup per file
+    blobs = {}
+    if files:
+        head_oid = node['headRefOid']
+        var_defs = ', '.join(f'$e{i}: String!' for i in range(len(files)))
+        lookups = ' '.join(
+            f'f{i}: object(expression: $e{i}) {{ ... on Blob {{ text }} }}' for i in range(len(files))
+        )
+        blob_query = (
+            f'query($owner: String!, $repo: String!, {var_defs}) {{ '
+            f'repository(owner: $owner, name: $repo) {{ {lookups} }} }}'
+        )
+        variables = {'owner': owner, 'repo': repo}
+        variables.update({f'e{i}': f"{head_oid}:{f['path']}" for i, f in enumerate(files)})
+        blobs = github_graphql(blob_query, variables, token).get('repository') or {}
+
+    # Shape the result like the REST payloads so build_prompt stays unchanged
+    try:
+        pr = {
+            'title': node['title'],
+            'body': node['body'],
+            'user': {'login': (node.get('author') or {}).get('login')},
+            'head': {'ref': node['headRefName'], 'sha': node['headRefOid']},
+            'base': {'ref': node['baseRefName']},
+        }
+        selected = []
+        for i, f in enumerate(files):
+            blob = blobs.get(f'f{i}') or {}
+            file_contents = blob.get('text')
+            if file_contents is None:
+                file_contents = FETCH_FAILED_CONTENTS
+            selected.append({
+                'filename': f['path'],
+                'status': GRAPHQL_CHANGE_TYPES.get(f['changeType'], f['changeType'].lower()),
+                'changes': f['additions'] + f['deletions'],
+                'contents': file_contents
+            })
+    except (KeyError, TypeError, AttributeError) as e:
+        raise GraphQLError(f'Unexpected pull request payload: {e!r}') from e
+    return pr, selected
+
+
+def fetch_pr_and_files(owner, repo, pr_number, token=None, max_files=5, max_tokens_per_file=500):
+    if token:
+        try:
+            return fetch_pr_and_files_graphql(owner, repo, pr_number, token, max_files, max_tokens_per_file)
+        except (GraphQLError, requests.RequestException):
+            # Tokens without GraphQL access, unexpected payloads and transport
+            # failures use the REST path
+            pass
+    return fetch_pr_and_files_rest(owner, repo, pr_number, token, max_files, max_tokens_per_file)
+
+
 def build_prompt(pr, files):
     title = pr.get('title', '')
     body = pr.get('body') or ''
@@ -76,31 +456,7 @@ def build_prompt(pr, files):
     branch = pr.get('head', {}).get('ref')
     base = pr.get('base', {}).get('ref')
 
-    prompt = []
-    prompt.append({
-        'role': 'system',
-        'content': (
-            "You are a senior software engineer and security expert. "
-            "Produce a clear, concise review of the pull request. "
-            "Return output strictly as JSON with keys: \n"
-            "  - summary (short text summary of the PR quality),\n"
-            "  - comments (list of objects with {path, block, issue, corrected_code, comment}),\n"
-            "  - labels (list of strings).\n\n"
-            "For each comment:\n"
-            "  - path: filename where the issue occurs.\n"
-            "  - block: the specific code block (few lines) where the issue exists.\n"
-            "  - issue: concise description of the problem.\n"
-            "  - corrected_code: corrected code snippet that fixes the issue.\n"
-            "  - comment: a clear explanation of the issue and how the fix resolves it.\n\n"
-            "Important rules:\n"
-            "- Output ONLY valid JSON (no extra text).\n"
-            "- Maximum 6 comments.\n"
-            "- Labels must be chosen from: security-issue, code-logic-issue, build-issue, "
-            "docs-issue, style-issue, perf-issue, other."
-        )
-    })
-
-    user_text = f"""
+    parts = [f"""
 PR title: {title}
 Author: {author}
 Branch: {branch} -> {base}
@@ -109,43 +465,69 @@ Description:
 {body}
 
 Changed files (up to {len(files)}):
-"""
-    for f in files:
-        user_text += (
-            f"\n---\nFile: {f['filename']} (status: {f['status']}, changes: {f['changes']})\n"
-            f"{f['contents']}\n"
-        )
-
-    user_text += "\nInstructions:\n- Review for correctness, code logic, security issues, architecture/design concerns, and potential build/test problems.\n- Produce up to 6 actionable comments.\n- Suggest labels chosen from: security-issue, code-logic-issue, build-issue, docs-issue, style-issue, perf-issue, other.\n- Output ONLY valid JSON.\n"
-
-    prompt.append({'role': 'user', 'content': user_text})
-    return prompt
+"""]
+    parts.extend(
+        f"\n---\nFile: {f['filename']} (status: {f['status']}, changes: {f['changes']}, "
+        f"view: {f.get('view', 'full')})\n"
+        f"{f['contents']}\n"
+        for f in files
+    )
+    parts.append(REVIEW_INSTRUCTIONS)
+    return [SYSTEM_MESSAGE, {'role': 'user', 'content': ''.join(parts)}]
 
 
-def call_openai_review(prompt_messages, model="gpt-4o-mini"):
+def call_openai_review(prompt_messages, model=REVIEW_MODEL):
     if not OPENAI_KEY:
         raise RuntimeError("OPENAI_API_KEY not set in environment")
 
-    resp = client.chat.completions.create(
+    key = hashlib.sha256(
+        json.dumps([model, prompt_messages], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    with REVIEW_CACHE_LOCK:
+        cached = REVIEW_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    # Collect deltas as they arrive and join once at the end; the context
+    # manager returns the connection to the pool even if reading fails
+    pieces = []
+    finish_reason = None
+    with client.chat.completions.create(
         model=model,
         messages=prompt_messages,
         max_tokens=1200,
         temperature=0.0,
-    )
-    return resp.choices[0].message.content
+        stream=True,
+    ) as stream:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                pieces.append(choice.delta.content)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    content = ''.join(pieces)
+
+    # Output cut off at max_tokens is returned but not cached as a complete review
+    if finish_reason != 'length':
+        with REVIEW_CACHE_LOCK:
+            cache_put(REVIEW_CACHE, key, content, REVIEW_CACHE_MAX_ENTRIES)
+    return content
 
 
 def parse_model_json_safe(text):
-    try:
-        start = text.index('{')
-        end = text.rfind('}')
-        json_text = text[start:end+1]
-        return json.loads(json_text)
-    except Exception:
+    # raw_decode parses the first JSON object in place and ignores any trailing
+    # prose or code fences, so the output is scanned once without slicing
+    start = text.find('{')
+    if start != -1:
         try:
-            return json.loads(text)
-        except Exception:
-            return {'summary': text.strip(), 'comments': [], 'labels': []}
+            obj, _ = JSON_DECODER.raw_decode(text, start)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+    return {'summary': text.strip(), 'comments': [], 'labels': []}
 
 
 def post_review_and_labels(owner, repo, pr_number, token, review_json):
@@ -181,11 +563,7 @@ def post_review_and_labels(owner, repo, pr_number, token, review_json):
     )
 
     labels = review_json.get('labels') or []
-    allowed = {
-        'security-issue', 'code-logic-issue', 'build-issue',
-        'docs-issue', 'style-issue', 'perf-issue', 'other'
-    }
-    to_add = [l for l in labels if l in allowed]
+    to_add = sorted(ALLOWED_LABELS.intersection(labels))
     labels_resp = None
     if to_add:
         labels_resp = github_post(
@@ -197,6 +575,71 @@ def post_review_and_labels(owner, repo, pr_number, token, review_json):
     return {'review': review_resp, 'labels': labels_resp}
 
 
+def result_cache_path(owner, repo, pr_number, head_sha):
+    key = f'{owner}/{repo}#{pr_number}@{head_sha}:{REVIEW_MODEL}'
+    return os.path.join(RESULT_CACHE_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def load_cached_result(path):
+    try:
+        # Expired files are left for sweep_result_cache; deleting here could
+        # remove a fresh file another worker has just written in its place
+        if time.time() - os.path.getmtime(path) > RESULT_CACHE_TTL:
+            return None
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def sweep_result_cache():
+    # Entries for commits that are never reviewed again would otherwise stay
+    # on disk forever; leftover temp files from crashed writes go too
+    global RESULT_CACHE_LAST_SWEEP
+    now = time.time()
+    with RESULT_CACHE_SWEEP_LOCK:
+        if now - RESULT_CACHE_LAST_SWEEP < RESULT_CACHE_SWEEP_INTERVAL:
+            return
+        RESULT_CACHE_LAST_SWEEP = now
+    cutoff = now - RESULT_CACHE_TTL
+    try:
+        with os.scandir(RESULT_CACHE_DIR) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+
+
+def store_cached_result(path, result):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    sweep_result_cache()
+
+
+def upstream_error_status(e, http_error_status):
+    # GitHub's own error responses keep the route's status; transport failures
+    # (timeouts, refused or dropped connections) are gateway errors
+    if isinstance(e, requests.HTTPError):
+        return http_error_status
+    if isinstance(e, requests.Timeout):
+        return 504
+    return 502
+
+
 # Routes
 @app.route('/')
 def index():
@@ -224,9 +667,20 @@ def review():
         }), 400
 
     try:
+        # Conditional GET, so checking the head sha is a cheap 304 on repeats
+        head_sha = github_get(f'/repos/{owner}/{repo}/pulls/{pr_number}', token=token)['head']['sha']
+        cached = load_cached_result(result_cache_path(owner, repo, pr_number, head_sha))
+        if cached is not None:
+            return jsonify(cached)
         pr, files = fetch_pr_and_files(owner, repo, pr_number, token=token)
-    except requests.HTTPError as e:
-        return jsonify({'error': 'Failed to fetch PR from GitHub', 'details': str(e)}), 400
+    except requests.RequestException as e:
+        return jsonify({
+            'error': 'Failed to fetch PR from GitHub', 'details': str(e)
+        }), upstream_error_status(e, 400)
+
+    # Stored under the head commit of the content actually reviewed, so a push
+    # between the lookup and the fetch cannot file it under the wrong commit
+    cache_path = result_cache_path(owner, repo, pr_number, pr['head']['sha'])
 
     prompt = build_prompt(pr, files)
     try:
@@ -238,14 +692,16 @@ def review():
 
     try:
         gh_resp = post_review_and_labels(owner, repo, pr_number, token, review_json)
-    except requests.HTTPError as e:
+    except requests.RequestException as e:
         return jsonify({
             'error': 'Failed to post review/labels to GitHub',
             'details': str(e),
             'model_output': review_json
-        }), 500
+        }), upstream_error_status(e, 500)
 
-    return jsonify({'status': 'success', 'model_output': review_json, 'github_response': gh_resp})
+    result = {'status': 'success', 'model_output': review_json, 'github_response': gh_resp}
+    store_cached_result(cache_path, result)
+    return jsonify(result)
 
 
 if __name__ == '__main__':